@@ -5,13 +5,26 @@
 #   streamlit run app.py
 #
 # Requisitos:
-#   pip install streamlit pandas
+#   pip install streamlit pandas pyarrow
+#   (opcional) pip install numba   → métricas compiladas
 
 import sys
 import re
+import csv
 import unicodedata
+from functools import lru_cache
+from io import BytesIO
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+try:
+    import numba
+except ImportError:  # numba es opcional: sin él se usa la versión NumPy
+    numba = None
 
 # ---------------------------
 # Bloque anti-"python app.py"
@@ -33,6 +46,7 @@ if __name__ == "__main__" and not _running_in_streamlit():
 # ---------------------------
 # Utilidades
 # ---------------------------
+@lru_cache(maxsize=512)
 def normalize_text(s):
     if s is None:
         return ""
@@ -43,97 +57,285 @@ def normalize_text(s):
     return s
 
 
-def find_column(df, candidates):
-    cols = {normalize_text(c): c for c in df.columns}
-    for c in candidates:
-        key = normalize_text(c)
-        if key in cols:
-            return cols[key]
-    return None
+def resolve_columns(columns):
+    # Una sola normalización por columna del archivo; ante varias columnas que
+    # calzan con la misma estándar gana el alias de mayor preferencia
+    found = {}
+    for c in columns:
+        hit = ALIAS_LOOKUP.get(normalize_text(c))
+        if hit is None:
+            continue
+        std, rank = hit
+        if std not in found or rank <= found[std][0]:
+            found[std] = (rank, c)
+    return {std: c for std, (_, c) in found.items()}
+
+
+def clean_text(s, upper=False):
+    # strip/upper en una pasada con kernels de Arrow (sin Series object intermedias)
+    try:
+        arr = pc.cast(pa.array(s, from_pandas=True), pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Columnas object con tipos mezclados
+        arr = pa.array(s.astype(str), type=pa.string())
+    arr = pc.utf8_trim_whitespace(arr)
+    if upper:
+        arr = pc.utf8_upper(arr)
+    arr = pc.fill_null(arr, "NA")
+    return pd.Series(pd.array(arr, dtype="string[pyarrow]"), index=s.index)
+
+
+def _dedupe_columns(names):
+    # Mismo criterio que pd.read_csv para encabezados repetidos: "x", "x.1", "x.2"…
+    # (sin reutilizar sufijos que ya existen en el encabezado original)
+    reserved, used, out = set(names), set(), []
+    for name in names:
+        new, i = name, 1
+        while new in used or (new != name and new in reserved):
+            new = f"{name}.{i}"
+            i += 1
+        used.add(new)
+        out.append(new)
+    return out
 
 
 def read_csv_safe(file):
+    # Separador detectado con los primeros 64 KiB → una sola lectura, con el
+    # lector multihilo de Arrow (columnas Arrow, sin "object" intermedio)
+    head = file.read(1 << 16)
+    file.seek(0)
+    sep = max([",", ";", "\t"], key=lambda d: head.count(d.encode()))
+
+    # Las presiones se leen directo como float32 (sin inferencia de tipo)
+    first_line = head.split(b"\n", 1)[0].decode("utf-8-sig", errors="replace")
+    header = next(csv.reader([first_line], delimiter=sep), [])
+    cols = resolve_columns(header)
+    column_types = {cols[c]: pa.float32() for c in ("presion_psi", "presion_optima_psi") if c in cols}
+
     try:
-        return pd.read_csv(file)
-    except Exception:
+        table = pacsv.read_csv(
+            file,
+            read_options=pacsv.ReadOptions(block_size=4 << 20),
+            parse_options=pacsv.ParseOptions(delimiter=sep),
+            convert_options=pacsv.ConvertOptions(
+                column_types=column_types,
+                strings_can_be_null=True,
+            ),
+        )
+    except pa.ArrowInvalid:
+        # p. ej. saltos de línea dentro de campos entre comillas, o presiones
+        # que no son números (se convierten a NaN más adelante)
         file.seek(0)
-        return pd.read_csv(file, sep=";")
+        return pd.read_csv(file, sep=sep)
+    # Arrow conserva los nombres repetidos tal cual; se renombran como pandas
+    # para que cada columna se pueda seleccionar como Series
+    if len(set(table.column_names)) < table.num_columns:
+        table = table.rename_columns(_dedupe_columns(table.column_names))
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
 
 
 # ---------------------------
 # Normalización CSV (Nazar + genérico)
 # ---------------------------
+# Alias aceptados por columna estándar, en orden de preferencia
+COLUMN_ALIASES = {
+    "patente": ["vehiculo", "vehículo", "patente", "ppu", "unidad"],
+    "presion_psi": ["valor presion", "valor presión", "presion", "presión", "psi", "presion_psi"],
+    "presion_optima_psi": ["presion correcta", "presión correcta", "presion optima", "presion óptima", "presion_optima"],
+
+    # Campos opcionales (si no existen → "NA")
+    "operacion": ["operacion", "operación", "flota", "faena", "cliente"],
+    "sede": ["sede", "terminal", "base", "planta"],
+    "ruta": ["ruta", "tramo", "origen destino", "origen-destino", "od"],
+
+    "marca_camion": ["marca camion", "marca camión", "marca vehiculo", "marca vehículo", "marca_camion"],
+    "modelo_camion": ["modelo camion", "modelo camión", "modelo vehiculo", "modelo vehículo", "modelo_camion"],
+
+    "marca_neumatico": ["marca neumatico", "marca neumático", "marca_neumatico", "marca"],
+    "modelo_neumatico": ["modelo neumatico", "modelo neumático", "modelo_neumatico", "modelo"],
+
+    "ciclo": ["ciclo", "etapa", "vida", "recauchado", "n recauchaje", "num recauchaje", "n_recauchaje"],
+}
+REQUIRED_COLUMNS = ("patente", "presion_psi", "presion_optima_psi")
+
+# alias normalizado → (columna estándar, preferencia); se calcula una vez al importar
+ALIAS_LOOKUP = {}
+for _std, _aliases in COLUMN_ALIASES.items():
+    for _rank, _alias in enumerate(_aliases):
+        ALIAS_LOOKUP.setdefault(normalize_text(_alias), (_std, _rank))
+
+
 def normalize_dataframe(df, filename):
-    out = df.copy()
+    # Modifica df en el lugar (sin copia): el llamador no vuelve a usar el crudo
+    out = df
     out["__archivo"] = filename
+    cols = resolve_columns(df.columns)
 
-    col_patente = find_column(out, ["vehiculo", "vehículo", "patente", "ppu", "unidad"])
-    col_presion = find_column(out, ["valor presion", "valor presión", "presion", "presión", "psi", "presion_psi"])
-    col_optima  = find_column(out, ["presion correcta", "presión correcta", "presion optima", "presion óptima", "presion_optima"])
-
-    if not col_patente or not col_presion or not col_optima:
+    if not all(c in cols for c in REQUIRED_COLUMNS):
         return pd.DataFrame()
 
-    out["patente"] = out[col_patente].astype(str).str.upper().str.strip()
-    out["presion_psi"] = pd.to_numeric(out[col_presion], errors="coerce")
-    out["presion_optima_psi"] = pd.to_numeric(out[col_optima], errors="coerce")
+    out["patente"] = clean_text(out[cols["patente"]], upper=True)
+    # float32 alcanza de sobra para psi y reduce a la mitad la memoria
+    out["presion_psi"] = pd.to_numeric(out[cols["presion_psi"]], errors="coerce").astype(np.float32)
+    out["presion_optima_psi"] = pd.to_numeric(out[cols["presion_optima_psi"]], errors="coerce").astype(np.float32)
 
     out = out.dropna(subset=["presion_psi", "presion_optima_psi"])
     if out.empty:
         return pd.DataFrame()
 
-    # Campos opcionales (si no existen → "NA")
-    def opt(names):
-        c = find_column(out, names)
-        return out[c].astype(str).str.strip() if c else "NA"
-
-    out["operacion"] = opt(["operacion", "operación", "flota", "faena", "cliente"])
-    out["sede"] = opt(["sede", "terminal", "base", "planta"])
-    out["ruta"] = opt(["ruta", "tramo", "origen destino", "origen-destino", "od"])
-
-    out["marca_camion"] = opt(["marca camion", "marca camión", "marca vehiculo", "marca vehículo", "marca_camion"])
-    out["modelo_camion"] = opt(["modelo camion", "modelo camión", "modelo vehiculo", "modelo vehículo", "modelo_camion"])
+    # Campos opcionales: si faltan, "NA" con el mismo dtype que las columnas
+    # presentes para que pd.concat no las suba a object
+    for std in COLUMN_ALIASES:
+        if std in REQUIRED_COLUMNS:
+            continue
+        if std in cols:
+            out[std] = clean_text(out[cols[std]])
+        else:
+            out[std] = pd.Series("NA", index=out.index, dtype="string[pyarrow]")
 
-    out["marca_neumatico"] = opt(["marca neumatico", "marca neumático", "marca_neumatico", "marca"])
-    out["modelo_neumatico"] = opt(["modelo neumatico", "modelo neumático", "modelo_neumatico", "modelo"])
+    return out
 
-    out["ciclo"] = opt(["ciclo", "etapa", "vida", "recauchado", "n recauchaje", "num recauchaje", "n_recauchaje"])
 
-    return out
+@st.cache_data(show_spinner=False)
+def _load_and_normalize(file_bytes, name):
+    # Cacheado por contenido: al mover un parámetro no se vuelve a parsear el CSV
+    raw = read_csv_safe(BytesIO(file_bytes))
+    return normalize_dataframe(raw, name)
+
+
+@st.cache_data(show_spinner=False)
+def _load_uploads(uploads, category_cols):
+    # Cacheado por el contenido de todos los archivos: concat y conversión a
+    # category solo se repiten cuando cambian los archivos, no al mover un widget
+    dfs = []
+    errores = []
+    for file_bytes, name in uploads:
+        norm = _load_and_normalize(file_bytes, name)
+        if norm.empty:
+            errores.append(name)
+        else:
+            dfs.append(norm)
+    if not dfs:
+        return None, errores
+
+    df = pd.concat(dfs, ignore_index=True)
+    # Claves de agrupación como category (después del concat, para que todas
+    # las categorías queden unificadas): groupby trabaja sobre códigos enteros
+    for col in category_cols:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df, errores
 
 
 # ---------------------------
 # Métricas EFILabs (normalizado a 100 km)
 # ---------------------------
+def _metrics_numpy(p, popt, k, mj):
+    # Un buffer float32 preasignado por columna y ufuncs con out=: sin Series
+    # ni temporales intermedios
+    delta, dpct, epct, idx, mje = np.empty((5, p.shape[0]), np.float32)
+    np.subtract(p, popt, out=delta)
+    np.abs(delta, out=dpct)
+    np.divide(dpct, popt, out=dpct)
+    np.multiply(dpct, np.float32(100.0), out=dpct)
+    np.multiply(dpct, k, out=epct)
+    np.add(epct, np.float32(100.0), out=idx)
+    np.divide(epct, np.float32(100.0), out=mje)
+    np.multiply(mje, mj, out=mje)
+    return delta, dpct, epct, idx, mje
+
+
+if numba is not None:
+    # Kernel fusionado: una sola pasada sobre las filas en lugar de un temporal
+    # por operación (se compila en _get_metrics_kernel).  Secuencial a propósito:
+    # la pasada está limitada por memoria, y un kernel parallel=True compilado en
+    # el hilo del script de Streamlit deja colgado el proceso al salir con la
+    # capa de hilos TBB de numba.
+    def _metrics_loop(p, popt, k, mj):
+        n = p.shape[0]
+        delta = np.empty(n, np.float32)
+        dpct = np.empty(n, np.float32)
+        epct = np.empty(n, np.float32)
+        idx = np.empty(n, np.float32)
+        mje = np.empty(n, np.float32)
+        for i in range(n):
+            d = p[i] - popt[i]
+            delta[i] = d
+            r = abs(d) / popt[i] * 100.0
+            dpct[i] = r
+            e = r * k
+            epct[i] = e
+            idx[i] = 100.0 + e
+            mje[i] = mj * e / 100.0
+        return delta, dpct, epct, idx, mje
+
+
+@st.cache_resource(show_spinner=False)
+def _get_metrics_kernel():
+    # Streamlit re-ejecuta el script en cada interacción: el kernel se compila
+    # una sola vez por proceso.  Sin cache=True: la caché en disco de numba
+    # registra el módulo que compiló y falla si el script corre con otro nombre
+    # (AppTest, importlib).
+    if numba is None:
+        return _metrics_numpy
+    # Firmas explícitas → compilación inmediata, sin despacho por tipos. Con
+    # Copy-on-Write, pandas entrega los arrays como solo lectura.
+    # fastmath sin nnan/ninf y error_model="numpy": presion_optima_psi = 0 da
+    # inf/NaN como en NumPy en lugar de ZeroDivisionError.
+    f4 = numba.types.float32
+    sigs = [
+        numba.types.UniTuple(f4[::1], 5)(arr, arr, f4, f4)
+        for arr in (numba.types.Array(f4, 1, "C", readonly=True), f4[::1])
+    ]
+    return numba.njit(
+        sigs,
+        fastmath={"nsz", "arcp", "contract", "afn", "reassoc"},
+        error_model="numpy",
+    )(_metrics_loop)
+
+
 def compute_metrics(df, k, mj_base_100km):
-    df = df.copy()
-    df["delta_psi"] = df["presion_psi"] - df["presion_optima_psi"]
-    df["desvio_presion_pct"] = (df["delta_psi"].abs() / df["presion_optima_psi"]) * 100.0
+    # Agrega las columnas sobre df en el lugar (sin copia del marco completo)
+    # Escalares float32 para que toda la aritmética se mantenga en float32
+    delta, dpct, epct, idx, mje = _get_metrics_kernel()(
+        np.ascontiguousarray(df["presion_psi"].to_numpy(np.float32)),
+        np.ascontiguousarray(df["presion_optima_psi"].to_numpy(np.float32)),
+        np.float32(k),
+        np.float32(mj_base_100km),
+    )
+    df["delta_psi"] = delta
+    df["desvio_presion_pct"] = dpct
 
     # % energía extra
-    df["energia_extra_pct"] = df["desvio_presion_pct"] * float(k)
+    df["energia_extra_pct"] = epct
 
     # Índice 100 = óptimo
-    df["indice_energia"] = 100.0 + df["energia_extra_pct"]
+    df["indice_energia"] = idx
 
     # MJ extra por 100 km
-    df["mj_extra_100km"] = float(mj_base_100km) * (df["energia_extra_pct"] / 100.0)
+    df["mj_extra_100km"] = mje
     return df
 
 
 def resumen(df, col):
-    return (
-        df.groupby(col, dropna=False)
-        .agg(
-            registros=("mj_extra_100km", "count"),
-            indice_prom=("indice_energia", "mean"),
-            energia_extra_prom_pct=("energia_extra_pct", "mean"),
-            mj_extra_prom=("mj_extra_100km", "mean"),
-            mj_extra_total=("mj_extra_100km", "sum"),
-        )
-        .reset_index()
-        .sort_values("mj_extra_prom", ascending=False)
+    # Una agregación por columna sobre los códigos de la category; solo
+    # conteo y sumas nativas, los promedios se derivan como suma/conteo
+    r = df.groupby(col, dropna=False, sort=False, observed=True).agg(
+        registros=("mj_extra_100km", "count"),
+        energia_extra_sum=("energia_extra_pct", "sum"),
+        mj_extra_total=("mj_extra_100km", "sum"),
     )
+    n = r["registros"]
+    energia_extra_prom = r["energia_extra_sum"] / n
+    r = pd.DataFrame({
+        "registros": n,
+        # indice_energia = 100 + energia_extra_pct fila a fila → igual en promedio
+        "indice_prom": 100.0 + energia_extra_prom,
+        "energia_extra_prom_pct": energia_extra_prom,
+        "mj_extra_prom": r["mj_extra_total"] / n,
+        "mj_extra_total": r["mj_extra_total"],
+    })
+    return r.reset_index()
 
 
 # ---------------------------
@@ -156,6 +358,9 @@ k = st.sidebar.number_input("k = % energía extra por 1% desvío de presión", 0
 mj_base_100km = st.sidebar.number_input("Energía base cada 100 km (MJ/100km)", 100.0, 50000.0, 1000.0, 100.0)
 top_n = st.sidebar.number_input("Top N", 5, 200, 15, 1)
 
+# Compila el kernel de métricas mientras el usuario elige archivos
+_get_metrics_kernel()
+
 files = st.file_uploader("Sube uno o más archivos CSV", type=["csv"], accept_multiple_files=True)
 
 # Si no hay archivos, no hacemos nada (no concatena)
@@ -163,26 +368,31 @@ if not files:
     st.info("Sube un CSV para comenzar.")
     st.stop()
 
-dfs = []
-errores = []
+categorias = [
+    ("Patente", "patente"),
+    ("Operación", "operacion"),
+    ("Sede", "sede"),
+    ("Ruta", "ruta"),
+    ("Marca camión", "marca_camion"),
+    ("Modelo camión", "modelo_camion"),
+    ("Marca neumático", "marca_neumatico"),
+    ("Modelo neumático", "modelo_neumatico"),
+    ("Ciclo", "ciclo"),
+]
 
-for f in files:
-    raw = read_csv_safe(f)
-    norm = normalize_dataframe(raw, f.name)
-    if norm.empty:
-        errores.append(f.name)
-    else:
-        dfs.append(norm)
+df, errores = _load_uploads(
+    tuple((f.getvalue(), f.name) for f in files),
+    tuple(col for _, col in categorias),
+)
 
 if errores:
     st.warning("No se pudieron procesar estos archivos (faltan columnas mínimas): " + ", ".join(errores))
 
 # Si nada se pudo procesar, no concatena
-if not dfs:
+if df is None:
     st.error("No hay datos para mostrar (ningún archivo cumplió con columnas mínimas).")
     st.stop()
 
-df = pd.concat(dfs, ignore_index=True)
 df = compute_metrics(df, k, mj_base_100km)
 
 # KPIs
@@ -198,21 +408,19 @@ st.dataframe(df.sort_values("mj_extra_100km", ascending=False), use_container_wi
 # Comparaciones (solo si hay más de 1 valor)
 st.subheader("Comparaciones (peores promedios arriba)")
 
-categorias = [
-    ("Patente", "patente"),
-    ("Operación", "operacion"),
-    ("Sede", "sede"),
-    ("Ruta", "ruta"),
-    ("Marca camión", "marca_camion"),
-    ("Modelo camión", "modelo_camion"),
-    ("Marca neumático", "marca_neumatico"),
-    ("Modelo neumático", "modelo_neumatico"),
-    ("Ciclo", "ciclo"),
-]
-
 for label, col in categorias:
-    if col in df.columns and df[col].nunique(dropna=False) > 1:
+    # Cardinalidad desde los metadatos de la category (O(1), sin recorrer filas);
+    # estas columnas no tienen nulos: los vacíos ya vienen como "NA"
+    if col in df.columns and df[col].cat.categories.size > 1:
         st.markdown(f"### {label}")
-        r = resumen(df, col).head(int(top_n))
+        # Selección parcial de los peores (sin ordenar todos los grupos)
+        r = resumen(df, col)
+        # Los promedios NaN (p. ej. 0/0 con ambas presiones en 0) se separan:
+        # como con sort_values, esos grupos completan el final si sobra lugar
+        nan_prom = r["mj_extra_prom"].isna()
+        top = r[~nan_prom].nlargest(int(top_n), "mj_extra_prom")
+        if len(top) < int(top_n):
+            top = pd.concat([top, r[nan_prom].head(int(top_n) - len(top))])
+        r = top
         st.dataframe(r, use_container_width=True)
         st.bar_chart(r.set_index(col)["mj_extra_prom"])
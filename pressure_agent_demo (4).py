@@ -48,8 +48,24 @@ apreciar cuántos litros de combustible representan las diferencias de
 energía calculadas.
 """
 
+from datetime import datetime
+
 import numpy as np
 
+try:
+    from numba import njit
+except ImportError:  # numba es opcional: sin él las funciones corren en Python/NumPy
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+# Banderas fastmath para los kernels compilados.  Se omiten 'nnan' y 'ninf'
+# para que una presión de 0 psi siga produciendo inf en vez de un resultado
+# indefinido; con error_model='numpy' la división escalar por cero da inf
+# (como en NumPy) en lugar de ZeroDivisionError.
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
 # Tabla de configuraciones de camiones con semirremolque.  Cada clave es una
 # cadena 'm×n' donde m es el número total de posiciones de ruedas y n el
 # número de ruedas motrices.  Los valores proporcionan descripciones
@@ -141,6 +157,14 @@ REFERENCE_PRESSURES = {
     'trailer': 100       # presiones para ejes del remolque
 }
 
+# Calibración del modelo de presión óptima, evaluada una sola vez al importar:
+# b a la velocidad de referencia y c_base = b0 / P_ref_bar**2 para cada tipo
+# de eje (ver :func:`pressure_optimum_scientific`).
+_BASELINE_SPEED = 80.0
+_B0 = 0.01 + 0.0095 * (_BASELINE_SPEED / 100.0) ** 2
+_INV_PSI_PER_BAR = 1.0 / 0.0689476
+_CBASE_BY_ROLE = {role: _B0 / (psi * 0.0689476) ** 2 for role, psi in REFERENCE_PRESSURES.items()}
+
 # Carga de referencia por eje en kilogramos.  Esta constante se utiliza
 # para normalizar la presión en función de la carga real por eje.  La
 # literatura sobre neumáticos comerciales indica que un neumático para
@@ -161,6 +185,40 @@ F_REF_KG = 6000
 MAX_TOTAL_WEIGHT_KG = 45000
 
 
+# Factor de ajuste de la presión según el tipo de superficie.  El tipo se
+# resuelve una sola vez a un código entero (0 = seca/asfalto, 1 = mojada,
+# 2 = irregular) que indexa la tabla numérica ``SURFACE_FACTOR``; así los
+# cálculos numéricos no comparan cadenas y pueden compilarse con numba.
+SURFACE_CODES = {'gravel': 2, 'sand': 2, 'rough': 2, 'wet': 1}
+SURFACE_FACTOR = np.array([1.0, 0.95, 0.9])
+
+
+def surface_factor_for(surface_type: str) -> float:
+    """Devuelve el factor de ajuste de presión para ``surface_type``
+    (1.0 si el tipo no está en ``SURFACE_CODES``)."""
+    return float(SURFACE_FACTOR[SURFACE_CODES.get(surface_type.lower(), 0)])
+
+
+# Número de ejes direccionales (steer) del tractor según la configuración.
+# Mapeo estándar basado en configuraciones conocidas; se puede ampliar si se añaden nuevas
+STEER_AXLES_MAPPING = {
+    '4x2': 1,
+    '6x2': 1,
+    '6x4': 1,
+    '4x4': 1,
+    '6x6': 1,
+    '8x2': 2,
+    '8x4': 2,
+    '8x6': 2,
+    '8x8': 2,
+    '10x4': 2,
+    '10x6': 2,
+    '10x8': 2,
+}
+
+# Densidad energética típica del diésel (MJ por litro)【654080661782584†L62-L70】
+MJ_PER_LITER_DIESEL = 35.86
+
 # Clasificación de semirremolques según el número de ejes
 SEMITRAILER_CLASSES = {
     'S1': {'axles': 1, 'description': 'Semirremolque de un eje'},
@@ -191,14 +249,14 @@ def validate_total_weight(loads_tractor, loads_trailer, max_total=MAX_TOTAL_WEIG
     muestra un mensaje de advertencia.
 
     Args:
-        loads_tractor (list[float]): Lista de cargas (kg) por eje del tractor.
-        loads_trailer (list[float]): Lista de cargas (kg) por eje del remolque.
+        loads_tractor (list[float] | np.ndarray): Cargas (kg) por eje del tractor.
+        loads_trailer (list[float] | np.ndarray): Cargas (kg) por eje del remolque.
         max_total (float): Peso máximo permitido en kg (por defecto 45 000 kg).
 
     Returns:
         None
     """
-    total_load = sum(loads_tractor) + sum(loads_trailer)
+    total_load = float(np.sum(loads_tractor) + np.sum(loads_trailer))
     if total_load > max_total:
         excess = total_load - max_total
         print(f"\nADVERTENCIA: La suma de las cargas por eje (%.1f kg) excede el límite legal de %d kg en %.1f kg." % (total_load, max_total, excess))
@@ -274,6 +332,21 @@ def pressure_agent(
     usando la ley de los gases ideales y se recorta a los límites
     ``P_min_psi`` y ``P_max_psi``.
     """
+    # Ajustes por superficie: se resuelve aquí, fuera del kernel compilado,
+    # porque numba no trabaja bien con cadenas arbitrarias
+    return _pressure_agent_kernel(
+        ambient_temp_c, topography_grade_percent, surface_factor_for(surface_type), load_per_axle_kg,
+        speed_kmh, vehicle_history_factor, P_ref_psi, F_ref_kg, k, T_hot_C,
+        P_min_psi, P_max_psi
+    )
+
+
+@njit(fastmath=_FASTMATH, error_model='numpy')
+def _pressure_agent_kernel(ambient_temp_c, topography_grade_percent, surface_factor,
+                           load_per_axle_kg, speed_kmh, vehicle_history_factor,
+                           P_ref_psi, F_ref_kg, k, T_hot_C, P_min_psi, P_max_psi):
+    """Parte numérica de :func:`pressure_agent` con la superficie ya resuelta
+    a un factor multiplicativo."""
     # Temperaturas absolutas para conversión gas ideal
     T_cold_K = ambient_temp_c + 273.15
     T_hot_K = T_hot_C + 273.15
@@ -284,11 +357,7 @@ def pressure_agent(
     if speed_kmh > 90:
         P_hot_psi *= 1.05
     # Ajustes por superficie
-    surface = surface_type.lower()
-    if surface in ['gravel', 'sand', 'rough']:
-        P_hot_psi *= 0.9
-    elif surface in ['wet']:
-        P_hot_psi *= 0.95
+    P_hot_psi *= surface_factor
     # Ajustes por topografía
     if topography_grade_percent > 5:
         P_hot_psi *= 0.95
@@ -302,6 +371,7 @@ def pressure_agent(
 
 
 # --- Nuevo modelo físico para presión óptima ---
+@njit(fastmath=_FASTMATH, error_model='numpy')
 def pressure_optimum_scientific(speed_kmh: float, P_ref_psi: float, baseline_speed_kmh: float = 80.0) -> float:
     r"""
     Calcula la presión de inflado en caliente que minimiza la resistencia al
@@ -325,13 +395,14 @@ def pressure_optimum_scientific(speed_kmh: float, P_ref_psi: float, baseline_spe
     Args:
         speed_kmh: Velocidad media del vehículo en km/h.
         P_ref_psi: Presión de referencia en psi (correspondiente a la presión
-            deseada en caliente a la velocidad de referencia).
+            deseada en caliente a la velocidad de referencia).  Puede ser un
+            arreglo NumPy con una referencia por eje.
         baseline_speed_kmh: Velocidad utilizada para calibrar el modelo (por
             defecto 80 km/h).
 
     Returns:
-        float: presión óptima en caliente (psi) que minimiza la resistencia
-            al rodado en las condiciones de velocidad dadas.
+        float | np.ndarray: presión óptima en caliente (psi) que minimiza la
+            resistencia al rodado en las condiciones de velocidad dadas.
     """
     # Constante b para la velocidad de referencia
     b0 = 0.01 + 0.0095 * ((baseline_speed_kmh) / 100.0) ** 2
@@ -347,6 +418,36 @@ def pressure_optimum_scientific(speed_kmh: float, P_ref_psi: float, baseline_spe
     P_opt_psi = P_opt_bar / 0.0689476
     return P_opt_psi
 
+def pressure_optimum_by_role(speed_kmh: float, role: str) -> float:
+    """Presión óptima en caliente (psi) para un tipo de eje de
+    ``REFERENCE_PRESSURES`` a la velocidad ``speed_kmh``.
+
+    Equivale a ``pressure_optimum_scientific(speed_kmh,
+    REFERENCE_PRESSURES[role])`` con la velocidad de referencia por defecto,
+    pero usa la constante ``c_base`` precalculada en ``_CBASE_BY_ROLE``.
+    """
+    b = 0.01 + 0.0095 * (speed_kmh / 100.0) ** 2
+    return (b / _CBASE_BY_ROLE[role]) ** 0.5 * _INV_PSI_PER_BAR
+
+
+@njit(fastmath=_FASTMATH, error_model='numpy')
+def rolling_speed_term(speed_kmh: float) -> float:
+    """Término de velocidad ``b = 0.01 + 0.0095*(v/100)**2`` del coeficiente
+    de resistencia al rodado.  Es constante durante un viaje, por lo que se
+    calcula una sola vez y se reutiliza para todos los ejes."""
+    return 0.01 + 0.0095 * (speed_kmh / 100.0) ** 2
+
+
+@njit(fastmath=_FASTMATH, error_model='numpy')
+def rolling_coefficient_from_speed_term(psi: float, b: float) -> float:
+    """Coeficiente de resistencia al rodado ``c = 0.005 + b/p`` a partir del
+    término de velocidad ``b`` ya calculado (ver :func:`rolling_speed_term`)."""
+    # Conversión de psi a bar: 1 psi = 0.0689476 bar
+    p_bar = psi * 0.0689476
+    return 0.005 + b / p_bar
+
+
+@njit(fastmath=_FASTMATH, error_model='numpy')
 def compute_rolling_coefficient(psi: float, speed_kmh: float) -> float:
     """Calcula el coeficiente de resistencia al rodado para un neumático.
 
@@ -364,13 +465,10 @@ def compute_rolling_coefficient(psi: float, speed_kmh: float) -> float:
     Returns:
         float: el coeficiente c adimensional.
     """
-    # Conversión de psi a bar: 1 psi = 0.0689476 bar
-    p_bar = psi * 0.0689476
-    # Fórmula del coeficiente de resistencia al rodado
-    c = 0.005 + (0.01 + 0.0095 * (speed_kmh / 100.0) ** 2) / p_bar
-    return c
+    return rolling_coefficient_from_speed_term(psi, rolling_speed_term(speed_kmh))
 
 
+@njit(fastmath=_FASTMATH, error_model='numpy')
 def compute_energy_consumption(psi: float, speed_kmh: float, load_per_axle_kg: float,
                                distance_km: float) -> float:
     """Calcula la energía (en julios) consumida por un neumático en un viaje.
@@ -378,6 +476,8 @@ def compute_energy_consumption(psi: float, speed_kmh: float, load_per_axle_kg: f
     Se calcula la fuerza de rodado F_r = c * W, siendo c el coeficiente de
     rodado y W el peso (masa*gravedad).  La energía por unidad de longitud es
     F_r, de modo que la energía total para una distancia d es F_r * d.
+    ``psi`` y ``load_per_axle_kg`` también aceptan arreglos NumPy (un valor
+    por eje), en cuyo caso se devuelve la energía de cada eje.
 
     Args:
         psi: presión de inflado en frío en psi.
@@ -388,7 +488,15 @@ def compute_energy_consumption(psi: float, speed_kmh: float, load_per_axle_kg: f
     Returns:
         float: energía consumida en julios (J) para ese neumático.
     """
-    c = compute_rolling_coefficient(psi, speed_kmh)
+    return energy_from_speed_term(psi, rolling_speed_term(speed_kmh), load_per_axle_kg, distance_km)
+
+
+@njit(fastmath=_FASTMATH, error_model='numpy')
+def energy_from_speed_term(psi: float, b: float, load_per_axle_kg: float,
+                           distance_km: float) -> float:
+    """Igual que :func:`compute_energy_consumption`, pero recibe el término
+    de velocidad ``b`` ya calculado en lugar de la velocidad."""
+    c = rolling_coefficient_from_speed_term(psi, b)
     weight_newtons = load_per_axle_kg * 9.81
     # Fuerza de rodadura (N)
     F_r = c * weight_newtons
@@ -399,6 +507,255 @@ def compute_energy_consumption(psi: float, speed_kmh: float, load_per_axle_kg: f
     return energy_j
 
 
+@njit(fastmath=_FASTMATH, error_model='numpy')
+def axle_pressure_and_energy(loads, P_hot_ref, min_psi, b, distance_km, trip_factor, k):
+    """Calcula en una sola pasada la presión óptima en frío y la energía de
+    cada eje.
+
+    Un único bucle sobre los ejes: la presión en frío recortada de cada eje
+    se usa de inmediato en la fórmula de energía y ambos resultados se
+    escriben en arreglos preasignados, sin temporales intermedios.
+
+    Args:
+        loads: arreglo con la carga (kg) de cada eje.
+        P_hot_ref: presión óptima en caliente (psi) de cada eje para la carga
+            de referencia ``F_REF_KG``.
+        min_psi: presión mínima admisible (psi) de cada eje.
+        b: término de velocidad del viaje (ver :func:`rolling_speed_term`).
+        distance_km: distancia recorrida en km.
+        trip_factor: producto de los factores constantes del viaje
+            (superficie, topografía, desgaste y conversión a frío).
+        k: exponente del ajuste por carga.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: presiones óptimas en frío (psi) y
+            energía (J) por eje.
+    """
+    n = loads.shape[0]
+    pressures = np.empty(n)
+    energies = np.empty(n)
+    for i in range(n):
+        P_cold = max(min(P_hot_ref[i] * (loads[i] / F_REF_KG) ** k * trip_factor, 120.0), min_psi[i])
+        pressures[i] = P_cold
+        energies[i] = energy_from_speed_term(P_cold, b, loads[i], distance_km)
+    return pressures, energies
+
+
+@njit(fastmath=_FASTMATH, error_model='numpy')
+def axle_energies(pressures, loads, b, distance_km):
+    """Energía (J) de cada eje con el mismo bucle escalar que
+    :func:`axle_pressure_and_energy`, de modo que presiones iguales den
+    exactamente la misma energía óptima y real."""
+    n = loads.shape[0]
+    energies = np.empty(n)
+    for i in range(n):
+        energies[i] = energy_from_speed_term(pressures[i], b, loads[i], distance_km)
+    return energies
+
+
+def _resolve_axle_counts(config_code: str, semi_info):
+    """Infiere el número de ejes del vehículo a partir de su configuración.
+
+    El número de ejes del tractor es la cantidad de posiciones / 2 (por
+    ejemplo '6x4' → 3 ejes), el del remolque proviene de la clase S1/S2/S3 y
+    el de ejes direccionales de ``STEER_AXLES_MAPPING``.
+
+    Args:
+        config_code (str): Configuración del tractor (ej. '6x4').
+        semi_info (dict|None): Datos del semirremolque devueltos por
+            :func:`get_semitrailer_details`.
+
+    Returns:
+        tuple: ``(num_tractor_axles, num_trailer_axles, num_steer_axles)``;
+            cada valor es None si no puede inferirse.
+    """
+    try:
+        num_tractor_axles = int(config_code.split('x')[0]) // 2
+    except (ValueError, IndexError):
+        num_tractor_axles = None
+    if num_tractor_axles is not None and num_tractor_axles <= 0:
+        num_tractor_axles = None
+    num_trailer_axles = semi_info['axles'] if semi_info and 'axles' in semi_info else None
+    num_steer_axles = STEER_AXLES_MAPPING.get(config_code, None)
+    return num_tractor_axles, num_trailer_axles, num_steer_axles
+
+
+def _compute_optimal_pressures(loads, P_ref, P_hot_opt_psi, trip_factor, b, distance_km, k=1.0):
+    """Calcula la presión óptima en frío y la energía estimada de cada eje.
+
+    Args:
+        loads (np.ndarray): Carga (kg) por eje.
+        P_ref (np.ndarray): Presión de referencia (psi) por eje.
+        P_hot_opt_psi (np.ndarray): Presión óptima en caliente (psi) por eje
+            a la velocidad del viaje.
+        trip_factor (float): Producto de los factores constantes del viaje.
+        b (float): Término de velocidad del viaje (ver :func:`rolling_speed_term`).
+        distance_km (float): Distancia del viaje en km.
+        k (float): Exponente del ajuste por carga.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: presiones óptimas (psi) y energías (J).
+    """
+    # Establecer un mínimo razonable (10 psi por debajo de la referencia) para evitar valores muy bajos
+    min_psi = np.maximum(P_ref - 10, 70)
+    return axle_pressure_and_energy(loads, P_hot_opt_psi, min_psi, b, distance_km, trip_factor, k)
+
+
+def _compute_energies(pressures, loads, b, distance_km):
+    """Calcula la energía (J) consumida por cada eje con las presiones dadas
+    y el término de velocidad ``b`` del viaje."""
+    return axle_energies(pressures, loads, b, distance_km)
+
+
+def _compare(energies_opt, energies_real):
+    """Compara las energías óptimas y reales por eje y en total.
+
+    Args:
+        energies_opt (np.ndarray): Energía (J) por eje del gemelo digital.
+        energies_real (np.ndarray): Energía (J) por eje con presiones reales.
+
+    Returns:
+        dict: brechas por eje en J (``gaps``), en % (``pct_gaps``) y en
+            litros de diésel (``gap_liters``), junto con los totales
+            ``energy_total_real``, ``energy_gap_total``,
+            ``percent_gap_total``, ``total_gap_mj`` y ``total_liters``.
+    """
+    gaps = energies_real - energies_opt
+    positive = energies_opt > 0
+    pct_gaps = np.where(positive, gaps / np.where(positive, energies_opt, 1.0) * 100.0, 0.0)
+    energy_total_opt = float(energies_opt.sum())
+    energy_total_real = float(energies_real.sum())
+    energy_gap_total = energy_total_real - energy_total_opt
+    percent_gap_total = (energy_gap_total / energy_total_opt) * 100.0 if energy_total_opt > 0 else 0.0
+    # L = (|gap_J| / 1e6) / MJ_PER_LITER_DIESEL
+    total_gap_mj = abs(energy_gap_total) / 1e6
+    return {
+        'gaps': gaps,
+        'pct_gaps': pct_gaps,
+        'gap_liters': np.abs(gaps) / 1e6 / MJ_PER_LITER_DIESEL,
+        'energy_total_real': energy_total_real,
+        'energy_gap_total': energy_gap_total,
+        'percent_gap_total': percent_gap_total,
+        'total_gap_mj': total_gap_mj,
+        'total_liters': total_gap_mj / MJ_PER_LITER_DIESEL,
+    }
+
+
+def _add_actual_pressures(trip: dict, actual_pressures) -> dict:
+    """Incorpora al resultado de :func:`compute_trip` las presiones reales,
+    su consumo energético y la comparación con el gemelo digital.
+
+    Raises:
+        ValueError: si no hay exactamente una presión real por eje.
+    """
+    actual_pressures = np.asarray(actual_pressures, dtype=float)
+    if actual_pressures.shape != trip['loads'].shape:
+        raise ValueError(
+            f"Se esperaba una presión real por eje, con forma {trip['loads'].shape}; "
+            f"se recibió forma {actual_pressures.shape}."
+        )
+    energies_real = _compute_energies(actual_pressures, trip['loads'], trip['speed_term'], trip['distance_km'])
+    trip['actual_pressures'] = actual_pressures
+    trip['energies_real'] = energies_real
+    trip.update(_compare(trip['energies_opt'], energies_real))
+    return trip
+
+
+def compute_trip(vehicle_spec: dict, loads_tractor, loads_trailer, trip_params: dict,
+                 actual_pressures=None) -> dict:
+    """Calcula las presiones óptimas, el gemelo digital y (opcionalmente) la
+    comparación con las presiones reales de un viaje, sin entrada/salida.
+
+    Es el mismo cálculo que realiza :func:`run_interactive_agent`, pero
+    recibiendo números y arreglos, de modo que puede invocarse para muchos
+    vehículos (por ejemplo, fila a fila de un DataFrame de flota).
+
+    Args:
+        vehicle_spec (dict): Datos del vehículo.  Debe incluir
+            ``'num_steer_axles'`` o ``'config_code'`` para inferirlo (por
+            defecto 1 eje direccional).
+        loads_tractor: Cargas (kg) por eje del tractor.
+        loads_trailer: Cargas (kg) por eje del remolque.
+        trip_params (dict): Variables del viaje: ``distance_km``,
+            ``ambient_temp_c``, ``topography_grade_percent``,
+            ``surface_type``, ``speed_kmh`` y ``vehicle_history_factor``.
+            Las ausentes toman los mismos valores por defecto que el flujo
+            interactivo.
+        actual_pressures: Presiones reales en frío (psi) por eje, tractor
+            primero y luego remolque.  Si se omite, solo se calcula el
+            gemelo digital.
+
+    Returns:
+        dict: ``loads``, ``P_ref``, ``optimal_pressures``, ``energies_opt``,
+            ``energy_total_opt`` y los datos del vehículo y del viaje.  Con
+            ``actual_pressures`` se añaden ``actual_pressures``,
+            ``energies_real`` y las claves de :func:`_compare`.
+
+    Raises:
+        ValueError: si ``actual_pressures`` no tiene un valor por eje.
+    """
+    distance_km = trip_params.get('distance_km', 1.0)
+    ambient_temp_c = trip_params.get('ambient_temp_c', 20.0)
+    topography_grade_percent = trip_params.get('topography_grade_percent', 0.0)
+    surface_type = trip_params.get('surface_type', '')
+    speed_kmh = trip_params.get('speed_kmh', 80.0)
+    vehicle_history_factor = trip_params.get('vehicle_history_factor', 0.98)
+
+    num_tractor_axles = len(loads_tractor)
+    num_steer_axles = vehicle_spec.get('num_steer_axles')
+    if num_steer_axles is None:
+        num_steer_axles = STEER_AXLES_MAPPING.get(vehicle_spec.get('config_code', ''), 1)
+
+    # Todos los ejes (tractor + remolque) se procesan juntos como arreglos NumPy.
+    loads = np.concatenate([np.asarray(loads_tractor, dtype=float),
+                            np.asarray(loads_trailer, dtype=float)])
+    # Presión de referencia por eje: direccional, otros ejes del tractor o remolque
+    is_steer = np.arange(num_tractor_axles) < num_steer_axles
+    P_ref = np.empty(loads.size)
+    P_ref[:num_tractor_axles] = np.where(is_steer, REFERENCE_PRESSURES['steer'],
+                                         REFERENCE_PRESSURES['tractor_other'])
+    P_ref[num_tractor_axles:] = REFERENCE_PRESSURES['trailer']
+    # Presión óptima en caliente basada en modelo físico, una vez por tipo de eje
+    P_hot_opt_psi = np.empty(loads.size)
+    P_hot_opt_psi[:num_tractor_axles] = np.where(is_steer, pressure_optimum_by_role(speed_kmh, 'steer'),
+                                                 pressure_optimum_by_role(speed_kmh, 'tractor_other'))
+    P_hot_opt_psi[num_tractor_axles:] = pressure_optimum_by_role(speed_kmh, 'trailer')
+    # Factores constantes durante todo el viaje, combinados en un único escalar:
+    # superficie, topografía, desgaste y conversión a frío (ley de los gases ideales)
+    surface_factor = surface_factor_for(surface_type)
+    topo_factor = 0.95 if topography_grade_percent > 5 else 1.0
+    T_hot_K = (60) + 273.15
+    T_cold_K = ambient_temp_c + 273.15
+    trip_factor = surface_factor * topo_factor * vehicle_history_factor * (T_cold_K / T_hot_K)
+    # Ajuste por carga: aumentar la presión en proporción a la relación de carga respecto a la carga de referencia.
+    # Para cargas mayores que la referencia, la presión se incrementa; para cargas menores, disminuye.
+    k = 1.0  # exponente lineal; puede ajustarse según datos empíricos
+    # Término de velocidad del coeficiente de rodado: el mismo para las
+    # energías óptimas y reales de todos los ejes
+    b = rolling_speed_term(speed_kmh)
+
+    # Presión óptima y energía por eje (gemelo digital) en una sola pasada
+    optimal_pressures, energies_opt = _compute_optimal_pressures(
+        loads, P_ref, P_hot_opt_psi, trip_factor, b, distance_km, k
+    )
+    trip = {
+        'num_tractor_axles': num_tractor_axles,
+        'num_trailer_axles': len(loads_trailer),
+        'num_steer_axles': num_steer_axles,
+        'speed_kmh': speed_kmh,
+        'speed_term': b,
+        'distance_km': distance_km,
+        'loads': loads,
+        'P_ref': P_ref,
+        'optimal_pressures': optimal_pressures,
+        'energies_opt': energies_opt,
+        'energy_total_opt': float(energies_opt.sum()),
+    }
+    if actual_pressures is not None:
+        _add_actual_pressures(trip, actual_pressures)
+    return trip
+
+
 def run_interactive_agent():
     """
     Ejecuta un flujo interactivo completo para calcular y comparar
@@ -412,6 +769,9 @@ def run_interactive_agent():
     neumáticos están usados y se aplica un pequeño factor de reducción
     interno al cálculo de la presión óptima.
 
+    Esta función solo recoge los datos con ``input()`` y muestra los
+    resultados; los cálculos se delegan en :func:`compute_trip`.
+
     Pasos:
     1. Solicita datos básicos del vehículo: configuración del tractor,
        patente y clasificación del semirremolque.
@@ -423,8 +783,8 @@ def run_interactive_agent():
     4. Solicita la carga en frío para cada eje del tractor y del remolque
        individualmente.
     5. Calcula la presión óptima en frío para cada eje utilizando la
-       referencia apropiada: 110 psi para ejes direccionales, 105 psi
-       para otros ejes del tractor y 100 psi para ejes del remolque.
+       referencia apropiada: 110 psi para ejes direccionales, 105 psi
+       para otros ejes del tractor y 100 psi para ejes del remolque.
        La presión óptima se ajusta según la carga y se aplica un factor
        constante (0,98) que representa un desgaste típico, ya que se
        asume que todos los neumáticos están usados.
@@ -436,7 +796,7 @@ def run_interactive_agent():
        y total.
     9. Presenta una tabla de equivalencia entre las brechas de energía
        (en megajulios) y el volumen de diésel que representaría esa
-       energía, utilizando una densidad energética típica de 35,86 MJ/L
+       energía, utilizando una densidad energética típica de 35,86 MJ/L
        para el diésel【654080661782584†L62-L70】.
     """
     # 1. Datos básicos del vehículo
@@ -483,49 +843,30 @@ def run_interactive_agent():
         speed_kmh = 80.0
     # Fijar un factor de desgaste para neumáticos usados.  Se asume
     # que todos los neumáticos están usados, por lo que aplicamos una
-    # reducción uniforme del 2 % en la presión óptima.  Si se desea
+    # reducción uniforme del 2 % en la presión óptima.  Si se desea
     # cambiar este valor, modifique la constante aquí.
     vehicle_history_factor = 0.98
 
-    # 3. Número de ejes del tractor (posiciones/2) y del remolque
-    try:
-        positions = int(config_code.split('x')[0])
-        num_tractor_axles = positions // 2
-    except (ValueError, IndexError):
-        num_tractor_axles = None
-
-    if num_tractor_axles is None or num_tractor_axles <= 0:
+    # 3. Número de ejes del tractor (posiciones/2), del remolque y direccionales;
+    # si no pueden inferirse se preguntan al usuario
+    num_tractor_axles, num_trailer_axles, num_steer_axles = _resolve_axle_counts(config_code, semi_info)
+    if num_tractor_axles is None:
         try:
             num_tractor_axles = int(input("No se pudo inferir el número de ejes del tractor. Ingrese la cantidad de ejes: ").strip())
+            if num_tractor_axles < 0:
+                # Un conteo negativo se trata como entrada no válida (np.empty lo rechazaría)
+                raise ValueError
         except ValueError:
             num_tractor_axles = 2
 
-    # Número de ejes del remolque según la clase
-    if semi_info and 'axles' in semi_info:
-        num_trailer_axles = semi_info['axles']
-    else:
+    if num_trailer_axles is None:
         try:
             num_trailer_axles = int(input("Ingrese el número de ejes del semirremolque: ").strip())
+            if num_trailer_axles < 0:
+                raise ValueError
         except ValueError:
             num_trailer_axles = 1
 
-    # 3b. Determinar cuántos ejes son direccionales (steer) en el tractor
-    # Mapeo estándar basado en configuraciones conocidas; se puede ampliar si se añaden nuevas
-    steer_axles_mapping = {
-        '4x2': 1,
-        '6x2': 1,
-        '6x4': 1,
-        '4x4': 1,
-        '6x6': 1,
-        '8x2': 2,
-        '8x4': 2,
-        '8x6': 2,
-        '8x8': 2,
-        '10x4': 2,
-        '10x6': 2,
-        '10x8': 2,
-    }
-    num_steer_axles = steer_axles_mapping.get(config_code, None)
     if num_steer_axles is None:
         # Si la configuración no está en el mapeo, preguntamos al usuario
         try:
@@ -534,14 +875,13 @@ def run_interactive_agent():
             num_steer_axles = 1
 
     print("\n--- Carga por eje ---")
-    loads_tractor = []
-    loads_trailer = []
+    loads_tractor = np.empty(num_tractor_axles, dtype=np.float64)
+    loads_trailer = np.empty(num_trailer_axles, dtype=np.float64)
     # Cargas por eje del tractor
     for i in range(num_tractor_axles):
         while True:
             try:
-                load_i = float(input(f"Carga en frío del eje del tractor {i+1} (kg): ").strip())
-                loads_tractor.append(load_i)
+                loads_tractor[i] = float(input(f"Carga en frío del eje del tractor {i+1} (kg): ").strip())
                 break
             except ValueError:
                 print("Entrada no válida. Por favor, introduzca un número.")
@@ -549,97 +889,35 @@ def run_interactive_agent():
     for i in range(num_trailer_axles):
         while True:
             try:
-                load_i = float(input(f"Carga en frío del eje del remolque {i+1} (kg): ").strip())
-                loads_trailer.append(load_i)
+                loads_trailer[i] = float(input(f"Carga en frío del eje del remolque {i+1} (kg): ").strip())
                 break
             except ValueError:
                 print("Entrada no válida. Por favor, introduzca un número.")
 
-    # Validar que la suma de cargas no exceda el límite de 45 000 kg
+    # Validar que la suma de cargas no exceda el límite de 45 000 kg
     validate_total_weight(loads_tractor, loads_trailer)
 
-    # 4. Calcular la presión óptima para cada eje usando el modelo científico
-    optimal_pressures_tractor = []
-    for i, load_i in enumerate(loads_tractor):
-        # Seleccionar la presión de referencia según si el eje es direccional o no
-        if i < num_steer_axles:
-            P_ref = REFERENCE_PRESSURES['steer']
-        else:
-            P_ref = REFERENCE_PRESSURES['tractor_other']
-        # Presión óptima en caliente basada en modelo físico
-        P_hot_opt_psi = pressure_optimum_scientific(speed_kmh=speed_kmh, P_ref_psi=P_ref)
-        # Ajuste por carga: aumentar la presión en proporción a la relación de carga respecto a la carga de referencia.
-        # Para cargas mayores que la referencia, la presión se incrementa; para cargas menores, disminuye.
-        load_ratio = load_i / F_REF_KG
-        k = 1.0  # exponente lineal; puede ajustarse según datos empíricos
-        P_hot_opt_psi *= load_ratio ** k
-        # Ajustes por superficie y topografía
-        surface = surface_type.lower()
-        if surface in ['gravel', 'sand', 'rough']:
-            P_hot_opt_psi *= 0.9
-        elif surface in ['wet']:
-            P_hot_opt_psi *= 0.95
-        if topography_grade_percent > 5:
-            P_hot_opt_psi *= 0.95
-        # Ajuste por desgaste
-        P_hot_opt_psi *= vehicle_history_factor
-        # Convertir a presión en frío usando ley de los gases ideales
-        T_hot_K = (60) + 273.15
-        T_cold_K = ambient_temp_c + 273.15
-        P_cold = P_hot_opt_psi * (T_cold_K / T_hot_K)
-        # Establecer un mínimo razonable (10 psi por debajo de la referencia) para evitar valores muy bajos
-        min_psi = max(P_ref - 10, 70)
-        # Limitar entre mínimo y máximo
-        P_cold = max(min(P_cold, 120), min_psi)
-        optimal_pressures_tractor.append(P_cold)
-    optimal_pressures_trailer = []
-    for load_i in loads_trailer:
-        P_ref = REFERENCE_PRESSURES['trailer']
-        # Presión óptima en caliente basada en modelo físico
-        P_hot_opt_psi = pressure_optimum_scientific(speed_kmh=speed_kmh, P_ref_psi=P_ref)
-        # Ajuste por carga del remolque
-        load_ratio = load_i / F_REF_KG
-        k = 1.0
-        P_hot_opt_psi *= load_ratio ** k
-        # Ajustes por superficie y topografía
-        surface = surface_type.lower()
-        if surface in ['gravel', 'sand', 'rough']:
-            P_hot_opt_psi *= 0.9
-        elif surface in ['wet']:
-            P_hot_opt_psi *= 0.95
-        if topography_grade_percent > 5:
-            P_hot_opt_psi *= 0.95
-        # Ajuste por desgaste
-        P_hot_opt_psi *= vehicle_history_factor
-        # Conversión a presión en frío
-        T_hot_K = (60) + 273.15
-        T_cold_K = ambient_temp_c + 273.15
-        P_cold = P_hot_opt_psi * (T_cold_K / T_hot_K)
-        # Mínimo razonable para remolque
-        min_psi = max(P_ref - 10, 70)
-        P_cold = max(min(P_cold, 120), min_psi)
-        optimal_pressures_trailer.append(P_cold)
-
-    # 5. Energía óptima por eje (gemelo digital)
-    energies_opt_tractor = []
-    for i, p_i in enumerate(optimal_pressures_tractor):
-        energy_i = compute_energy_consumption(
-            psi=p_i,
-            speed_kmh=speed_kmh,
-            load_per_axle_kg=loads_tractor[i],
-            distance_km=distance_km
-        )
-        energies_opt_tractor.append(energy_i)
-    energies_opt_trailer = []
-    for i, p_i in enumerate(optimal_pressures_trailer):
-        energy_i = compute_energy_consumption(
-            psi=p_i,
-            speed_kmh=speed_kmh,
-            load_per_axle_kg=loads_trailer[i],
-            distance_km=distance_km
-        )
-        energies_opt_trailer.append(energy_i)
-    energy_total_opt = sum(energies_opt_tractor) + sum(energies_opt_trailer)
+    # 4-5. Presión óptima y gemelo digital
+    vehicle_spec = {
+        'config_code': config_code,
+        'semi_class': semi_class,
+        'plate': plate,
+        'num_steer_axles': num_steer_axles,
+    }
+    trip_params = {
+        'distance_km': distance_km,
+        'ambient_temp_c': ambient_temp_c,
+        'topography_grade_percent': topography_grade_percent,
+        'surface_type': surface_type,
+        'speed_kmh': speed_kmh,
+        'vehicle_history_factor': vehicle_history_factor,
+    }
+    trip = compute_trip(vehicle_spec, loads_tractor, loads_trailer, trip_params)
+    # Vistas por tipo de vehículo para los reportes
+    optimal_pressures_tractor = trip['optimal_pressures'][:num_tractor_axles]
+    optimal_pressures_trailer = trip['optimal_pressures'][num_tractor_axles:]
+    energies_opt_tractor = trip['energies_opt'][:num_tractor_axles]
+    energies_opt_trailer = trip['energies_opt'][num_tractor_axles:]
 
     print("\n--- Gemelo digital (configuración óptima) ---")
     # Mostrar presiones óptimas del tractor
@@ -649,94 +927,60 @@ def run_interactive_agent():
     # Mostrar presiones óptimas del remolque
     for i, (p_i, e_i) in enumerate(zip(optimal_pressures_trailer, energies_opt_trailer)):
         print(f"Remolque eje {i+1}: presión óptima {p_i:.1f} psi, energía estimada {e_i/1e6:.3f} MJ")
-    print(f"Energía total estimada (todos los ejes): {energy_total_opt/1e6:.3f} MJ")
+    print(f"Energía total estimada (todos los ejes): {trip['energy_total_opt']/1e6:.3f} MJ")
 
     # 6. Solicitar presiones reales por eje
     print("\n--- Introducir presiones reales en frío ---")
-    actual_pressures_tractor = []
+    # Un solo arreglo para todos los ejes: tractor primero y luego remolque
+    actual_pressures = np.empty(num_tractor_axles + num_trailer_axles, dtype=np.float64)
     for i in range(num_tractor_axles):
         while True:
             try:
-                p = float(input(f"Presión real del eje del tractor {i+1} (psi): ").strip())
-                actual_pressures_tractor.append(p)
+                actual_pressures[i] = float(input(f"Presión real del eje del tractor {i+1} (psi): ").strip())
                 break
             except ValueError:
                 print("Entrada no válida. Por favor, introduzca un número.")
-    actual_pressures_trailer = []
     for i in range(num_trailer_axles):
         while True:
             try:
-                p = float(input(f"Presión real del eje del remolque {i+1} (psi): ").strip())
-                actual_pressures_trailer.append(p)
+                actual_pressures[num_tractor_axles + i] = float(input(f"Presión real del eje del remolque {i+1} (psi): ").strip())
                 break
             except ValueError:
                 print("Entrada no válida. Por favor, introduzca un número.")
 
-    # 7. Calcular energía real para cada eje
-    energies_real_tractor = []
-    for i, p in enumerate(actual_pressures_tractor):
-        energy_real_i = compute_energy_consumption(
-            psi=p,
-            speed_kmh=speed_kmh,
-            load_per_axle_kg=loads_tractor[i],
-            distance_km=distance_km
-        )
-        energies_real_tractor.append(energy_real_i)
-    energies_real_trailer = []
-    for i, p in enumerate(actual_pressures_trailer):
-        energy_real_i = compute_energy_consumption(
-            psi=p,
-            speed_kmh=speed_kmh,
-            load_per_axle_kg=loads_trailer[i],
-            distance_km=distance_km
-        )
-        energies_real_trailer.append(energy_real_i)
-    energy_total_real = sum(energies_real_tractor) + sum(energies_real_trailer)
+    # 7. Calcular energía real para cada eje y compararla con el gemelo digital
+    _add_actual_pressures(trip, actual_pressures)
+    real_rows = list(zip(trip['energies_real'], trip['gaps'], trip['pct_gaps'], trip['gap_liters']))
 
     # 8. Comparación
     print("\n--- Comparación de consumos ---")
-    # Tractor
-    for i, (opt, real) in enumerate(zip(energies_opt_tractor, energies_real_tractor)):
-        gap = real - opt
-        pct = (gap / opt) * 100.0 if opt > 0 else 0.0
-        sign = "más" if gap > 0 else "menos"
-        tipo = 'direccional' if i < num_steer_axles else 'tractor'
-        print(f"Tractor eje {i+1} ({tipo}): energía real {real/1e6:.3f} MJ, brecha {abs(gap)/1e6:.3f} MJ {sign} (" +
-              f"{abs(pct):.2f}% {'más' if gap > 0 else 'menos'} energía)")
-    # Remolque
-    for i, (opt, real) in enumerate(zip(energies_opt_trailer, energies_real_trailer)):
-        gap = real - opt
-        pct = (gap / opt) * 100.0 if opt > 0 else 0.0
+    for i, (real, gap, pct, _) in enumerate(real_rows):
         sign = "más" if gap > 0 else "menos"
-        print(f"Remolque eje {i+1}: energía real {real/1e6:.3f} MJ, brecha {abs(gap)/1e6:.3f} MJ {sign} (" +
+        if i < num_tractor_axles:
+            tipo = 'direccional' if i < num_steer_axles else 'tractor'
+            label = f"Tractor eje {i+1} ({tipo})"
+        else:
+            label = f"Remolque eje {i-num_tractor_axles+1}"
+        print(f"{label}: energía real {real/1e6:.3f} MJ, brecha {abs(gap)/1e6:.3f} MJ {sign} (" +
               f"{abs(pct):.2f}% {'más' if gap > 0 else 'menos'} energía)")
     # Total
-    energy_gap_total = energy_total_real - energy_total_opt
-    percent_gap_total = (energy_gap_total / energy_total_opt) * 100.0 if energy_total_opt > 0 else 0.0
+    energy_gap_total = trip['energy_gap_total']
     sign_total = "más" if energy_gap_total > 0 else "menos"
-    print(f"\nEnergía total real para el viaje: {energy_total_real/1e6:.3f} MJ")
+    print(f"\nEnergía total real para el viaje: {trip['energy_total_real']/1e6:.3f} MJ")
     print(f"Diferencia total respecto al gemelo digital: {abs(energy_gap_total)/1e6:.3f} MJ {sign_total} (" +
-          f"{abs(percent_gap_total):.2f}% {'más' if energy_gap_total > 0 else 'menos'} energía)")
+          f"{abs(trip['percent_gap_total']):.2f}% {'más' if energy_gap_total > 0 else 'menos'} energía)")
 
     # 9. Tabla de equivalencia MJ → litros de diésel
-    # Densidad energética típica del diésel (MJ por litro)【654080661782584†L62-L70】
-    MJ_PER_LITER_DIESEL = 35.86
     print("\n--- Equivalencia de brechas de energía a litros de diésel ---")
-    # Para cada brecha de energía, convertir primero a MJ y luego a litros
-    # L = (|gap_J| / 1e6) / MJ_PER_LITER_DIESEL
-    for i, (opt, real) in enumerate(zip(energies_opt_tractor, energies_real_tractor)):
-        gap_j = real - opt  # diferencia en julios
-        gap_mj = abs(gap_j) / 1e6
-        liters = gap_mj / MJ_PER_LITER_DIESEL
-        tipo = 'direccional' if i < num_steer_axles else 'tractor'
-        print(f"Tractor eje {i+1} ({tipo}): {gap_mj:.3f} MJ -> {liters:.3f} L de diésel")
-    for i, (opt, real) in enumerate(zip(energies_opt_trailer, energies_real_trailer)):
-        gap_j = real - opt
-        gap_mj = abs(gap_j) / 1e6
-        liters = gap_mj / MJ_PER_LITER_DIESEL
-        print(f"Remolque eje {i+1}: {gap_mj:.3f} MJ -> {liters:.3f} L de diésel")
-    total_gap_mj = abs(energy_gap_total) / 1e6
-    total_liters = total_gap_mj / MJ_PER_LITER_DIESEL
+    for i, (_, gap, _, liters) in enumerate(real_rows):
+        if i < num_tractor_axles:
+            tipo = 'direccional' if i < num_steer_axles else 'tractor'
+            label = f"Tractor eje {i+1} ({tipo})"
+        else:
+            label = f"Remolque eje {i-num_tractor_axles+1}"
+        print(f"{label}: {abs(gap)/1e6:.3f} MJ -> {liters:.3f} L de diésel")
+    total_gap_mj = trip['total_gap_mj']
+    total_liters = trip['total_liters']
     print(f"Total: {total_gap_mj:.3f} MJ -> {total_liters:.3f} L de diésel")
 
     # 10. Mostrar fórmulas utilizadas
@@ -745,7 +989,6 @@ def run_interactive_agent():
         print(f"{nombre}: {formula}")
 
     # 11. Preparar y guardar registro en Google Sheets (stub)
-    from datetime import datetime
     fecha_hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     # Recopilar datos en una lista. Algunos campos son cadenas concatenadas por ';' para
     # almacenar múltiples valores en una celda.
@@ -756,10 +999,10 @@ def run_interactive_agent():
         semi_class,
         distance_km,
         speed_kmh,
-        ';'.join(f"{x:.1f}" for x in loads_tractor + loads_trailer),
-        ';'.join(f"{x:.1f}" for x in optimal_pressures_tractor + optimal_pressures_trailer),
-        ';'.join(f"{x:.1f}" for x in actual_pressures_tractor + actual_pressures_trailer),
-        ';'.join(f"{(real - opt)/1e6:.3f}" for opt, real in list(zip(energies_opt_tractor + energies_opt_trailer, energies_real_tractor + energies_real_trailer))),
+        ';'.join(np.char.mod('%.1f', trip['loads'])),
+        ';'.join(np.char.mod('%.1f', trip['optimal_pressures'])),
+        ';'.join(np.char.mod('%.1f', trip['actual_pressures'])),
+        ';'.join(np.char.mod('%.3f', trip['gaps'] / 1e6)),
         total_gap_mj,
         total_liters
     ]